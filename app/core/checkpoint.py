@@ -0,0 +1,183 @@
+"""
+Per-job checkpoint journal, so interrupted jobs resume instead of starting over.
+"""
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+JOURNAL_FILE = "checkpoint.jsonl"
+SPEC_FILE = "job.json"
+
+
+def file_sha256(path: Path, chunk_size: int = 1024 * 1024) -> str:
+    """
+    Hash a file in chunks.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as fp:
+        for chunk in iter(lambda: fp.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def fsync_path(path: Path) -> None:
+    """
+    fsync a file (its contents) or a directory (its entries) by path.
+    """
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def write_job_spec(job_dir: Path, spec: dict) -> None:
+    """
+    Atomically record the parameters a job was started with, at job_<id>/job.json.
+    """
+    path = job_dir / SPEC_FILE
+    tmp_path = path.with_suffix(".json.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as fp:
+        json.dump(spec, fp, indent=2)
+        fp.flush()
+        os.fsync(fp.fileno())
+    os.replace(tmp_path, path)
+
+
+def read_job_spec(job_dir: Path) -> Optional[dict]:
+    """
+    Load the parameters a job was started with, or None if they were never recorded.
+    """
+    try:
+        with open(job_dir / SPEC_FILE, "r", encoding="utf-8") as fp:
+            return json.load(fp)
+    except (OSError, json.JSONDecodeError):
+        return None
+
+
+class JobCheckpoint:
+    """
+    Append-only journal of completed work, stored at job_<id>/checkpoint.jsonl.
+    Each line records one unit of work (a converted document, a table, a section,
+    a finished backend). `record` flushes and fsyncs the line before returning, so a
+    crash loses at most the unit in progress. Per-table records go through
+    `record_deferred` and are written `batch_size` at a time with a single fsync; a
+    crash loses at most one batch, and those tables are simply exported again.
+    Large intermediate results are kept as JSON artifacts under job_<id>/<backend>/.checkpoint/.
+    """
+    def __init__(self, job_dir: Path, batch_size: int = 32):
+        self.job_dir = job_dir
+        self.path = job_dir / JOURNAL_FILE
+        self.batch_size = batch_size
+        self._lock = threading.Lock()
+        self._records: Dict[tuple, Any] = {}
+        self._pending: List[Tuple[tuple, str, Any]] = []
+        self._pending_dirs: Set[Path] = set()
+        if self.path.exists():
+            self._drop_torn_tail()
+            with open(self.path, "r", encoding="utf-8") as fp:
+                for line in fp:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    self._records[(entry["backend"], entry["kind"], str(entry["key"]))] = entry.get("data")
+
+    def _drop_torn_tail(self) -> None:
+        # A crash mid-write can leave an unterminated last line. Cut it off, or the
+        # next append would be glued onto it and lost on the following load.
+        with open(self.path, "rb+") as fp:
+            data = fp.read()
+            if not data or data.endswith(b"\n"):
+                return
+            fp.truncate(data.rfind(b"\n") + 1)
+            fp.flush()
+            os.fsync(fp.fileno())
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def has(self, backend: str, kind: str, key) -> bool:
+        return (backend, kind, str(key)) in self._records
+
+    def get(self, backend: str, kind: str, key, default=None):
+        return self._records.get((backend, kind, str(key)), default)
+
+    def record(self, backend: str, kind: str, key, data: Any = None) -> None:
+        """
+        Durably record a completed unit of work, along with any deferred records before it.
+        """
+        with self._lock:
+            self._queue(backend, kind, key, data)
+            self._flush()
+
+    def record_deferred(self, backend: str, kind: str, key, data: Any = None, sync_dir: Optional[Path] = None) -> None:
+        """
+        Record a completed unit of work whose output files are already fsynced.
+        The record is written with the next batch; `sync_dir`, the directory holding
+        those files, is fsynced first so their names are durable before the journal vouches for them.
+        """
+        with self._lock:
+            self._queue(backend, kind, key, data)
+            if sync_dir is not None:
+                self._pending_dirs.add(sync_dir)
+            if len(self._pending) >= self.batch_size:
+                self._flush()
+
+    def flush(self) -> None:
+        """
+        Write any deferred records.
+        """
+        with self._lock:
+            self._flush()
+
+    def _queue(self, backend: str, kind: str, key, data: Any) -> None:
+        line = json.dumps({"backend": backend, "kind": kind, "key": key, "data": data}, default=str)
+        self._pending.append(((backend, kind, str(key)), line, data))
+
+    def _flush(self) -> None:
+        if not self._pending:
+            return
+        for directory in self._pending_dirs:
+            fsync_path(directory)
+        with open(self.path, "a", encoding="utf-8") as fp:
+            fp.write("".join(line + "\n" for _, line, _ in self._pending))
+            fp.flush()
+            os.fsync(fp.fileno())
+        for record_key, _, data in self._pending:
+            self._records[record_key] = data
+        self._pending.clear()
+        self._pending_dirs.clear()
+
+    def _artifact_path(self, backend: str, name: str) -> Path:
+        return self.job_dir / backend / ".checkpoint" / f"{name}.json"
+
+    def save_json(self, backend: str, name: str, obj: Any) -> None:
+        """
+        Atomically write a JSON artifact and record it in the journal.
+        """
+        path = self._artifact_path(backend, name)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(".json.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as fp:
+            json.dump(obj, fp)
+            fp.flush()
+            os.fsync(fp.fileno())
+        os.replace(tmp_path, path)
+        fsync_path(path.parent)
+        self.record(backend, "artifact", name)
+
+    def load_json(self, backend: str, name: str) -> Optional[Any]:
+        """
+        Load a recorded JSON artifact, or None if it was never completed.
+        """
+        if not self.has(backend, "artifact", name):
+            return None
+        path = self._artifact_path(backend, name)
+        if not path.exists():
+            return None
+        with open(path, "r", encoding="utf-8") as fp:
+            return json.load(fp)
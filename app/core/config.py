@@ -14,6 +14,15 @@ class Settings(BaseSettings):
     llamaparse_api_key: str
     unstructured_api_key: str
     openai_api_key: str
+    upload_dir: str = "uploads"
+    upload_chunk_size: int = 1024 * 1024
+    upload_max_bytes: int = 200 * 1024 * 1024
+    upload_ttl_seconds: int = 24 * 60 * 60
+    export_workers: int = 0  # 0 exports tables inline on the job thread
+    export_executor: str = "thread"  # "thread" or "process"
+    job_state_dir: str = "job_state"
+    resume_jobs_on_startup: bool = True
+    shutdown_drain_seconds: float = 30.0
 
     class Config:
         case_sensitive = True
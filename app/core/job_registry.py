@@ -0,0 +1,261 @@
+"""
+In-process registry mapping job ids to their output directories, plus the
+set of in-flight jobs. In-flight jobs are also persisted to the job state
+directory so they can be resumed after a restart.
+"""
+import asyncio
+import json
+import os
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+from app.core.config import settings
+
+_job_dirs: Dict[str, Path] = {}
+# Reentrant, since stop_accepting_jobs runs from a signal handler on the main thread.
+_lock = threading.RLock()
+_active_jobs: Dict[str, dict] = {}
+_active_changed = threading.Condition(_lock)
+_accepting = True
+_exclusive_job: Optional[str] = None
+_drain_deadline: Optional[float] = None
+
+
+class JobRejected(Exception):
+    """Exception for jobs that cannot be started right now."""
+    def __init__(self, message: str, status_code: int = 409):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class JobNotResumable(JobRejected):
+    """Exception for interrupted jobs that can no longer be resumed (input gone or parameters changed)."""
+
+
+def is_valid_job_id(job_id: str) -> bool:
+    """
+    Check that a job id is a UUID, so it is safe to use in a path.
+    """
+    try:
+        return str(uuid.UUID(job_id)) == job_id
+    except ValueError:
+        return False
+
+
+def job_output_dir(output_dir: str, job_id: str) -> Path:
+    """
+    Return the job directory for a user output directory: <output_dir>/table_outputs/job_<id>.
+    """
+    return Path(output_dir) / "table_outputs" / f"job_{job_id}"
+
+
+def register_job(job_id: str, job_dir: Path) -> None:
+    """
+    Record where a job writes its outputs.
+    """
+    with _lock:
+        _job_dirs[job_id] = job_dir
+
+
+def get_job_dir(job_id: str, output_dir: Optional[str] = None) -> Optional[Path]:
+    """
+    Resolve a job directory from the registry, or from `output_dir` for jobs
+    run before the last restart. Returns None if the directory does not exist.
+    """
+    if not is_valid_job_id(job_id):
+        return None
+    with _lock:
+        job_dir = _job_dirs.get(job_id)
+    if job_dir is None and output_dir:
+        job_dir = job_output_dir(output_dir, job_id)
+    if job_dir is None or not job_dir.is_dir():
+        return None
+    return job_dir
+
+
+def _state_path(job_id: str) -> Path:
+    return Path(settings.job_state_dir) / f"{job_id}.json"
+
+
+def is_accepting_jobs() -> bool:
+    return _accepting
+
+
+def stop_accepting_jobs(drain_seconds: float) -> None:
+    """
+    Refuse new jobs from now on and start the drain deadline. Later calls keep the first deadline.
+    """
+    global _accepting, _drain_deadline
+    with _active_changed:
+        _accepting = False
+        if _drain_deadline is None:
+            _drain_deadline = time.monotonic() + drain_seconds
+        # Wake jobs held behind an exclusive job so they are refused.
+        _active_changed.notify_all()
+
+
+def drain_time_left() -> float:
+    """
+    Seconds left until the drain deadline (0 if draining has not started or the deadline passed).
+    """
+    if _drain_deadline is None:
+        return 0.0
+    return max(_drain_deadline - time.monotonic(), 0.0)
+
+
+def is_job_active(job_id: str) -> bool:
+    with _lock:
+        return job_id in _active_jobs
+
+
+def is_job_interrupted(job_id: str) -> bool:
+    """
+    True if the job was in flight when the process last stopped and has not been resumed yet.
+    """
+    return not is_job_active(job_id) and _state_path(job_id).exists()
+
+
+def start_job(job_id: str, spec: dict, exclusive: bool = False) -> None:
+    """
+    Mark a job as in flight and persist its parameters so it can be resumed.
+    While an exclusive job (e.g. a profiled one) is running, other jobs wait for it to finish.
+    Args:
+        job_id (str): The job id.
+        spec (dict): Job parameters, persisted to the job state directory.
+        exclusive (bool): Require that no other job runs alongside this one.
+    Raises:
+        JobRejected: If the server is draining, the job is already running, or
+            the job is exclusive and other jobs are in flight.
+    """
+    global _exclusive_job
+    with _active_changed:
+        while _accepting and _exclusive_job is not None and _exclusive_job != job_id:
+            _active_changed.wait()
+        if not _accepting:
+            raise JobRejected("Server is shutting down and not accepting new jobs.", status_code=503)
+        if job_id in _active_jobs:
+            raise JobRejected(f"Job {job_id} is already running.", status_code=409)
+        if exclusive and _active_jobs:
+            raise JobRejected(
+                f"Job {job_id} must run alone, but {len(_active_jobs)} other jobs are in flight.",
+                status_code=409
+            )
+        _active_jobs[job_id] = spec
+        if exclusive:
+            _exclusive_job = job_id
+    path = _state_path(job_id)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(".json.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as fp:
+        json.dump(spec, fp)
+        fp.flush()
+        os.fsync(fp.fileno())
+    os.replace(tmp_path, path)
+
+
+def finish_job(job_id: str) -> None:
+    """
+    Mark a job as no longer in flight and drop its persisted state.
+    """
+    try:
+        _state_path(job_id).unlink()
+    except FileNotFoundError:
+        pass
+    global _exclusive_job
+    with _active_changed:
+        _active_jobs.pop(job_id, None)
+        if _exclusive_job == job_id:
+            _exclusive_job = None
+        _active_changed.notify_all()
+
+
+def drop_job_state(job_id: str) -> None:
+    """
+    Forget an interrupted job that cannot be resumed, so it is not retried on every start.
+    """
+    if is_job_active(job_id):
+        return
+    try:
+        _state_path(job_id).unlink()
+    except FileNotFoundError:
+        pass
+
+
+def job_input_paths() -> List[Path]:
+    """
+    Input files of in-flight and interrupted jobs, which must outlive the upload TTL sweep.
+    """
+    with _lock:
+        specs = list(_active_jobs.values())
+    specs += pending_jobs()
+    return [Path(spec["input_file_path"]) for spec in specs if spec.get("input_file_path")]
+
+
+def pending_jobs() -> List[dict]:
+    """
+    Jobs that were in flight when the process last stopped.
+    """
+    state_dir = Path(settings.job_state_dir)
+    if not state_dir.is_dir():
+        return []
+    specs = []
+    for path in sorted(state_dir.glob("*.json")):
+        try:
+            with open(path, "r", encoding="utf-8") as fp:
+                spec = json.load(fp)
+        except (OSError, json.JSONDecodeError):
+            continue
+        if is_valid_job_id(spec.get("job_id", "")) and not is_job_active(spec["job_id"]):
+            specs.append(spec)
+    return specs
+
+
+def wait_for_active_jobs(timeout: float) -> List[str]:
+    """
+    Wait up to `timeout` seconds for in-flight jobs to finish.
+    Returns:
+        List[str]: Ids of jobs still running at the deadline.
+    """
+    deadline = time.monotonic() + timeout
+    with _active_changed:
+        while _active_jobs:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            _active_changed.wait(remaining)
+        return list(_active_jobs)
+
+
+async def run_in_job_thread(fn: Callable, *args) -> Any:
+    """
+    Run a job on its own daemon thread and await its result. Unlike the default
+    threadpool, this does not hold up process exit once the drain deadline has
+    passed; the job's checkpoint lets it resume on the next start.
+    """
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+
+    def set_result(result, exc) -> None:
+        if future.cancelled():
+            return
+        if exc is not None:
+            future.set_exception(exc)
+        else:
+            future.set_result(result)
+
+    def target() -> None:
+        result, exc = None, None
+        try:
+            result = fn(*args)
+        except BaseException as e:
+            exc = e
+        try:
+            loop.call_soon_threadsafe(set_result, result, exc)
+        except RuntimeError:
+            # The event loop has already closed (shutdown after the drain deadline).
+            pass
+
+    threading.Thread(target=target, name="extraction-job", daemon=True).start()
+    return await future
@@ -1,11 +1,18 @@
-from fastapi import APIRouter, Form, status, HTTPException
-from typing import Dict
+from fastapi import APIRouter, Form, Request, status, HTTPException
+from typing import Dict, List, Optional
 from pathlib import Path
 from app.services.docling_service import extract_tables_from_file as docling_extract_tables_from_file, DOCLING_AVAILABLE
 from app.services.llamaparse_service import extract_tables_llamaparse
 from app.services.unstructured_service import extract_tables_from_file_unstructured, client as unstructured_client
 from app.schemas.extraction import ExtractionResponse, TableInfo, ExtractionResult
+from app.utils.upload_utils import StreamingUploadParser, UploadError, cleanup_expired_uploads
+from app.core.config import settings
+from app.core.job_registry import JobRejected, JobNotResumable, job_output_dir, register_job, get_job_dir, start_job, finish_job, pending_jobs, drop_job_state, job_input_paths, is_accepting_jobs, run_in_job_thread
+from app.core.checkpoint import JobCheckpoint, file_sha256, read_job_spec, write_job_spec
+from app.utils.profiling import JobProfiler, profile_stage
+from starlette.concurrency import run_in_threadpool
 import shutil
+import threading
 import uuid
 import logging
 import os
@@ -31,63 +38,279 @@ def filter_summary_fields(result):
         return {k: v for k, v in result.dict().items() if k in SUMMARY_FIELDS}
     return result
 
+def run_extraction(
+    input_file_path: str,
+    output_dir: str,
+    docling: bool,
+    llamaparse: bool,
+    unstructured: bool,
+    profile: bool = False,
+    job_id: Optional[str] = None
+) -> dict:
+    """
+    Run the selected extractors on an input file.
+    If `job_id` is given, that job is resumed from its checkpoint journal instead of starting a new one.
+    Returns the response body: job_id, results per backend and, when profiling, a profile summary.
+    """
+    resuming = job_id is not None
+    job_id = job_id or str(uuid.uuid4())
+    jobs_db: Dict[str, dict] = {job_id: {}}
+    # Resolved paths, so a resume does not depend on the working directory.
+    input_file_path = str(Path(input_file_path).resolve())
+    output_dir = str(Path(output_dir).resolve())
+    spec = {
+        "job_id": job_id,
+        "input_file_path": input_file_path,
+        "output_dir": output_dir,
+        "docling": docling,
+        "llamaparse": llamaparse,
+        "unstructured": unstructured
+    }
+    if resuming and not Path(input_file_path).is_file():
+        raise JobNotResumable(f"Input file of job {job_id} no longer exists: {input_file_path}", status_code=404)
+    job_spec = {**spec, "input_sha256": file_sha256(Path(input_file_path))}
+    if resuming:
+        check_resume_spec(job_output_dir(output_dir, job_id), job_spec)
+    # A profile traces the whole process, so a profiled job must run alone.
+    # Both checks happen before any job state is written.
+    profiler = None
+    if profile:
+        try:
+            profiler = JobProfiler(job_id).start()
+        except RuntimeError as e:
+            raise HTTPException(status_code=409, detail=str(e))
+    try:
+        start_job(job_id, spec, exclusive=profile)
+    except JobRejected:
+        if profiler is not None:
+            profiler.stop()
+        raise
+
+    checkpoint = None
+    try:
+        job_dir = job_output_dir(output_dir, job_id)
+        job_dir.mkdir(parents=True, exist_ok=True)
+        register_job(job_id, job_dir)
+        if not resuming:
+            for subfolder in ["docling", "llamaparse", "unstructured"]:
+                subfolder_path = job_dir / subfolder
+                if subfolder_path.exists() and subfolder_path.is_dir():
+                    shutil.rmtree(subfolder_path)
+            write_job_spec(job_dir, job_spec)
+        checkpoint = JobCheckpoint(job_dir)
+        if resuming:
+            _log.info(f"Resuming extraction job {job_id} with {len(checkpoint)} checkpointed steps")
+
+        results = run_backends(input_file_path, job_dir, job_id, jobs_db, docling, llamaparse, unstructured, profiler, checkpoint)
+    finally:
+        profile_path = None
+        try:
+            if checkpoint is not None:
+                # Keep the tables finished before a failure.
+                try:
+                    checkpoint.flush()
+                except OSError as e:
+                    _log.error(f"Flushing checkpoint for job {job_id} failed: {e}")
+            if profiler is not None:
+                try:
+                    profile_path = profiler.write(job_dir / "profile")
+                    _log.info(f"Wrote profile for job {job_id}: {profile_path}")
+                except Exception as e:
+                    _log.error(f"Writing profile for job {job_id} failed: {e}")
+        finally:
+            finish_job(job_id)
+    response = {"job_id": job_id, "results": results}
+    if profiler is not None:
+        profile_summary = profiler.summary()
+        if profile_path is not None:
+            profile_summary = {"path": str(profile_path.absolute()), **profile_summary}
+        response["profile"] = profile_summary
+    return response
+
+def check_resume_spec(job_dir: Path, job_spec: dict) -> None:
+    """
+    Make sure a resume request matches the parameters the job was started with, so it
+    neither writes into a fresh directory nor reuses cached results of a different input.
+    Raises:
+        JobNotResumable: 404 if the job has no recorded parameters, 409 on any mismatch.
+    """
+    saved_spec = read_job_spec(job_dir)
+    if saved_spec is None:
+        raise JobNotResumable(f"No resumable job {job_spec['job_id']} in {job_dir}.", status_code=404)
+    mismatched = [key for key, value in job_spec.items() if saved_spec.get(key) != value]
+    if mismatched:
+        raise JobNotResumable(
+            f"Job {job_spec['job_id']} was started with different parameters: {', '.join(mismatched)}.",
+            status_code=409
+        )
+
+def run_backends(
+    input_file_path: str,
+    job_dir: Path,
+    job_id: str,
+    jobs_db: Dict[str, dict],
+    docling: bool,
+    llamaparse: bool,
+    unstructured: bool,
+    profiler=None,
+    checkpoint: Optional[JobCheckpoint] = None
+) -> dict:
+    """
+    Run each selected backend in turn, collecting summaries or error messages.
+    Backends already completed according to the checkpoint are not run again.
+    """
+    backends = [
+        ("docling", "Docling", docling, lambda: docling_extract_tables_from_file(
+            input_file_path, job_dir, job_id, jobs_db, TableInfo, ExtractionResult, _log, profiler, checkpoint
+        )),
+        ("llamaparse", "LlamaParse", llamaparse, lambda: extract_tables_llamaparse(
+            input_file_path, job_dir, job_id, jobs_db, TableInfo, ExtractionResult, _log, profiler, checkpoint
+        )),
+        ("unstructured", "Unstructured", unstructured, lambda: extract_tables_from_file_unstructured(
+            input_file_path, job_dir, job_id, jobs_db, TableInfo, ExtractionResult, _log, unstructured_client, profiler, checkpoint
+        )),
+    ]
+    results = {}
+    _log.info(f"Starting extraction job {job_id} for file: {input_file_path}")
+    for name, label, selected, extract_fn in backends:
+        if not selected:
+            continue
+        if checkpoint is not None and checkpoint.has(name, "done", "result"):
+            _log.info(f"{label} already completed for job {job_id}, skipping.")
+            results[name] = filter_summary_fields(checkpoint.get(name, "done", "result"))
+            continue
+        try:
+            with profile_stage(profiler, name, snapshot=True):
+                result = extract_fn()
+            if checkpoint is not None:
+                checkpoint.record(name, "done", "result", filter_summary_fields(result))
+            results[name] = filter_summary_fields(result)
+        except Exception as e:
+            _log.error(f"{label} extraction failed: {e}")
+            results[name] = f"{label} extraction failed: {str(e)}"
+    _log.info(f"Extraction job {job_id} completed.")
+    return results
+
+def resume_pending_jobs() -> List[str]:
+    """
+    Resume, in background threads, jobs that were in flight when the process last stopped.
+    """
+    resumed = []
+    for spec in pending_jobs():
+        job_id = spec["job_id"]
+        thread = threading.Thread(
+            target=_resume_job,
+            args=(spec,),
+            name=f"resume-{job_id}",
+            daemon=True
+        )
+        thread.start()
+        resumed.append(job_id)
+    return resumed
+
+def _resume_job(spec: dict) -> None:
+    try:
+        run_extraction(
+            spec["input_file_path"], spec["output_dir"],
+            spec["docling"], spec["llamaparse"], spec["unstructured"],
+            job_id=spec["job_id"]
+        )
+    except JobNotResumable as e:
+        _log.error(f"Dropping interrupted job {spec['job_id']}: {e}")
+        drop_job_state(spec["job_id"])
+    except Exception as e:
+        _log.error(f"Resuming job {spec['job_id']} failed: {e}")
+
+def parse_form_bool(fields: Dict[str, str], name: str, default: Optional[bool] = None) -> bool:
+    """
+    Parse a boolean form field from a streamed multipart body. Required unless a default is given.
+    """
+    if name not in fields:
+        if default is not None:
+            return default
+        raise HTTPException(status_code=422, detail=f"Missing form field: {name}")
+    value = fields[name].strip().lower()
+    if value in ("true", "1", "yes", "on"):
+        return True
+    if value in ("false", "0", "no", "off"):
+        return False
+    raise HTTPException(status_code=422, detail=f"Form field {name} must be a boolean.")
+
 @router.post("/extract", status_code=status.HTTP_200_OK)
 async def extract(
     input_file_path: str = Form(..., description="Absolute path to the input document on the server"),
     output_dir: str = Form(..., description="Absolute path to the output directory (will be created/freshened)"),
     docling: bool = Form(..., description="Use Docling backend"),
     llamaparse: bool = Form(..., description="Use LlamaParse backend"),
-    unstructured: bool = Form(..., description="Use Unstructured backend")
+    unstructured: bool = Form(..., description="Use Unstructured backend"),
+    profile: bool = Form(False, description="Record a CPU/memory profile for this job"),
+    resume_job_id: Optional[str] = Form(None, description="Resume an interrupted job from its checkpoint instead of starting a new one")
 ):
     """
     Unified endpoint to extract tables using selected extractors. User provides input file path and output directory.
     Returns extraction results for each selected backend and the job_id.
     """
-    job_id = str(uuid.uuid4())
-    jobs_db: Dict[str, dict] = {job_id: {}}
+    if not is_accepting_jobs():
+        raise HTTPException(status_code=503, detail="Server is shutting down and not accepting new jobs.")
     input_path = Path(input_file_path)
     if not input_path.exists() or not input_path.is_file():
         _log.error(f"Input file does not exist: {input_file_path}")
         raise HTTPException(status_code=400, detail="Input file does not exist or is not a file.")
+    if resume_job_id:
+        # The registry knows where the job ran; it must be this output_dir.
+        job_dir = get_job_dir(resume_job_id, output_dir)
+        if job_dir is None or job_dir.resolve() != job_output_dir(output_dir, resume_job_id).resolve():
+            raise HTTPException(status_code=404, detail="Job to resume not found in output_dir.")
+    return await run_in_job_thread(
+        run_extraction, input_file_path, output_dir, docling, llamaparse, unstructured, profile, resume_job_id or None
+    )
 
-    user_output_dir = Path(output_dir)
-    table_outputs_dir = user_output_dir / "table_outputs"
-    table_outputs_dir.mkdir(parents=True, exist_ok=True)
-    job_output_dir = table_outputs_dir / f"job_{job_id}"
-    job_output_dir.mkdir(exist_ok=True)
-    for subfolder in ["docling", "llamaparse", "unstructured"]:
-        subfolder_path = job_output_dir / subfolder
-        if subfolder_path.exists() and subfolder_path.is_dir():
-            shutil.rmtree(subfolder_path)
+@router.post("/extract/upload", status_code=status.HTTP_200_OK)
+async def extract_upload(request: Request):
+    """
+    Upload variant of /extract. The multipart body carries the document as the `file` part
+    plus the `output_dir`, `docling`, `llamaparse` and `unstructured` form fields.
+    The file is streamed in fixed-size chunks into the uploads directory and handed to the
+    selected backends from there. Returns the job_id, upload metadata and extraction results.
+    """
+    if not is_accepting_jobs():
+        raise HTTPException(status_code=503, detail="Server is shutting down and not accepting new jobs.")
+    upload_dir = Path(settings.upload_dir)
+    removed = await run_in_threadpool(cleanup_expired_uploads, upload_dir, settings.upload_ttl_seconds, job_input_paths())
+    if removed:
+        _log.info(f"Removed {removed} expired uploads from {upload_dir}")
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > settings.upload_max_bytes + 64 * 1024:
+        raise HTTPException(status_code=413, detail=f"Upload exceeds maximum size of {settings.upload_max_bytes} bytes.")
+    try:
+        parser = StreamingUploadParser(
+            request.headers.get("content-type", ""),
+            upload_dir,
+            chunk_size=settings.upload_chunk_size,
+            max_bytes=settings.upload_max_bytes
+        )
+        upload = await parser.parse(request.stream())
+    except UploadError as e:
+        _log.error(f"Upload rejected: {e}")
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+    _log.info(f"Stored upload {upload.upload_id}: {upload.path} ({upload.size} bytes, sha256={upload.sha256})")
 
-    results = {}
-    _log.info(f"Starting extraction job {job_id} for file: {input_file_path}")
-    if docling:
-        try:
-            docling_result = docling_extract_tables_from_file(
-                input_file_path, job_output_dir, job_id, jobs_db, TableInfo, ExtractionResult, _log
-            )
-            results["docling"] = filter_summary_fields(docling_result)
-        except Exception as e:
-            _log.error(f"Docling extraction failed: {e}")
-            results["docling"] = f"Docling extraction failed: {str(e)}"
-    if llamaparse:
-        try:
-            llamaparse_result = extract_tables_llamaparse(
-                input_file_path, job_output_dir, job_id, jobs_db, TableInfo, ExtractionResult, _log
-            )
-            results["llamaparse"] = filter_summary_fields(llamaparse_result)
-        except Exception as e:
-            _log.error(f"LlamaParse extraction failed: {e}")
-            results["llamaparse"] = f"LlamaParse extraction failed: {str(e)}"
-    if unstructured:
-        try:
-            unstructured_result = extract_tables_from_file_unstructured(
-                input_file_path, job_output_dir, job_id, jobs_db, TableInfo, ExtractionResult, _log, unstructured_client
-            )
-            results["unstructured"] = filter_summary_fields(unstructured_result)
-        except Exception as e:
-            _log.error(f"Unstructured extraction failed: {e}")
-            results["unstructured"] = f"Unstructured extraction failed: {str(e)}"
-    _log.info(f"Extraction job {job_id} completed.")
-    return {"job_id": job_id, "results": results} 
\ No newline at end of file
+    try:
+        if not parser.fields.get("output_dir"):
+            raise HTTPException(status_code=422, detail="Missing form field: output_dir")
+        job_args = (
+            str(upload.path),
+            parser.fields["output_dir"],
+            parse_form_bool(parser.fields, "docling"),
+            parse_form_bool(parser.fields, "llamaparse"),
+            parse_form_bool(parser.fields, "unstructured"),
+            parse_form_bool(parser.fields, "profile", default=False)
+        )
+    except HTTPException:
+        # Don't keep a stored upload around until its TTL for a request that never ran.
+        await run_in_threadpool(shutil.rmtree, upload.path.parent, True)
+        _log.info(f"Removed upload {upload.upload_id} after rejecting its form fields")
+        raise
+    response = await run_in_job_thread(run_extraction, *job_args)
+    response["upload"] = upload.dict()
+    return response
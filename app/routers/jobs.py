@@ -0,0 +1,89 @@
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import Response, StreamingResponse
+from typing import List, Optional
+from app.core.job_registry import get_job_dir, is_job_active, is_job_interrupted
+from app.core.checkpoint import JobCheckpoint
+from app.utils.archive_utils import collect_entries, archive_etag, archive_size, iter_zip, slice_stream, parse_range
+import logging
+
+router = APIRouter(prefix="/jobs", tags=["Jobs"])
+_log = logging.getLogger(__name__)
+
+@router.get("/{job_id}")
+def job_status(
+    job_id: str,
+    output_dir: Optional[str] = Query(None, description="Output directory the job was run with, for jobs from before a restart")
+):
+    """
+    Report whether a job is still running and which backends have completed, from its checkpoint journal.
+    """
+    job_dir = get_job_dir(job_id, output_dir)
+    if job_dir is None:
+        raise HTTPException(status_code=404, detail="Job not found.")
+    checkpoint = JobCheckpoint(job_dir)
+    completed = {
+        backend: checkpoint.get(backend, "done", "result")
+        for backend in ["docling", "llamaparse", "unstructured"]
+        if checkpoint.has(backend, "done", "result")
+    }
+    if is_job_active(job_id):
+        job_state = "running"
+    elif is_job_interrupted(job_id):
+        job_state = "interrupted"
+    else:
+        job_state = "finished"
+    return {
+        "job_id": job_id,
+        "status": job_state,
+        "completed_backends": completed,
+        "checkpointed_steps": len(checkpoint)
+    }
+
+@router.get("/{job_id}/archive")
+def download_archive(
+    job_id: str,
+    request: Request,
+    backend: Optional[List[str]] = Query(None, description="Only include these backends (docling, llamaparse, unstructured)"),
+    format: Optional[List[str]] = Query(None, description="Only include these file formats (csv, html, xlsx)"),
+    output_dir: Optional[str] = Query(None, description="Output directory the job was run with, for jobs from before a restart")
+):
+    """
+    Stream a zip of a job's outputs, built on the fly from the job directory.
+    Supports single byte-range requests (with If-Range) for resuming downloads.
+    """
+    job_dir = get_job_dir(job_id, output_dir)
+    if job_dir is None:
+        raise HTTPException(status_code=404, detail="Job not found.")
+    entries = collect_entries(job_dir, backend, format)
+    if not entries:
+        raise HTTPException(status_code=404, detail="No output files match the requested filters.")
+    etag = archive_etag(entries)
+    headers = {
+        "Accept-Ranges": "bytes",
+        "ETag": etag,
+        "Content-Disposition": f'attachment; filename="job_{job_id}.zip"'
+    }
+
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header and (if_range is None or if_range == etag):
+        total = archive_size(entries, etag)
+        try:
+            byte_range = parse_range(range_header, total)
+        except ValueError as e:
+            _log.warning(f"Archive range rejected for job {job_id}: {e}")
+            return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{total}"})
+        if byte_range is not None:
+            start, end = byte_range
+            headers["Content-Range"] = f"bytes {start}-{end}/{total}"
+            headers["Content-Length"] = str(end - start + 1)
+            _log.info(f"Streaming archive bytes {start}-{end}/{total} for job {job_id}")
+            return StreamingResponse(
+                slice_stream(iter_zip(entries), start, end),
+                status_code=206,
+                media_type="application/zip",
+                headers=headers
+            )
+
+    _log.info(f"Streaming archive of {len(entries)} files for job {job_id}")
+    return StreamingResponse(iter_zip(entries), media_type="application/zip", headers=headers)
@@ -7,9 +7,12 @@ from pathlib import Path
 from datetime import datetime
 import logging
 from typing import Any, Dict
+from app.utils.profiling import profile_stage
+from app.utils.table_export import TableExporter, docling_table_html, export_docling_table, write_docling_table
 
 try:
     from docling.document_converter import DocumentConverter
+    from docling_core.types.doc import DoclingDocument
     DOCLING_AVAILABLE = True
 except ImportError:
     DOCLING_AVAILABLE = False
@@ -25,7 +28,9 @@ def extract_tables_from_file(
     jobs_db: Dict[str, Any],
     TableInfo,
     ExtractionResult,
-    _log: logging.Logger
+    _log: logging.Logger,
+    profiler=None,
+    checkpoint=None
 ) -> object:
     """
     Extract tables from a document using Docling and save as CSV/HTML.
@@ -37,6 +42,9 @@ def extract_tables_from_file(
         TableInfo: Pydantic model for table info.
         ExtractionResult: Pydantic model for extraction result.
         _log (logging.Logger): Logger instance.
+        profiler (JobProfiler, optional): Records per-stage timings when profiling is enabled.
+        checkpoint (JobCheckpoint, optional): Journal used to skip the conversion and
+            tables already completed by an interrupted run of this job.
     Returns:
         ExtractionResult: Extraction result object.
     Raises:
@@ -49,53 +57,50 @@ def extract_tables_from_file(
         jobs_db[job_id]["progress"] = 10
         jobs_db[job_id]["message"] = "Initializing DocumentConverter..."
         _log.info(f"[Docling] Starting extraction for job {job_id}")
-        doc_converter = DocumentConverter()
         start_time = time.time()
-        jobs_db[job_id]["progress"] = 20
-        jobs_db[job_id]["message"] = "Converting document..."
-        conv_res = doc_converter.convert(input_file_path)
+        saved_document = checkpoint.load_json("docling", "document") if checkpoint is not None else None
+        if saved_document is not None:
+            _log.info(f"[Docling] Resuming job {job_id} from checkpointed document")
+            document = DoclingDocument.model_validate(saved_document)
+        else:
+            doc_converter = DocumentConverter()
+            jobs_db[job_id]["progress"] = 20
+            jobs_db[job_id]["message"] = "Converting document..."
+            with profile_stage(profiler, "convert"):
+                conv_res = doc_converter.convert(input_file_path)
+            document = conv_res.document
+            if checkpoint is not None:
+                checkpoint.save_json("docling", "document", document.export_to_dict())
         docling_dir = output_dir / "docling"
         docling_dir.mkdir(parents=True, exist_ok=True)
         doc_filename = Path(input_file_path).stem
-        tables_info = []
-        total_tables = len(conv_res.document.tables)
+        total_tables = len(document.tables)
         jobs_db[job_id]["progress"] = 30
         jobs_db[job_id]["message"] = f"Found {total_tables} tables. Processing..."
-        for table_ix, table in enumerate(conv_res.document.tables):
-            progress = 30 + int((table_ix / total_tables) * 60)
-            jobs_db[job_id]["progress"] = progress
-            jobs_db[job_id]["message"] = f"Processing table {table_ix + 1}/{total_tables}..."
-            table_df: pd.DataFrame = table.export_to_dataframe()
-            if table_df.empty:
-                _log.warning(f"[Docling] Table {table_ix} is empty, skipping...")
-                continue
-            _log.info(f"[Docling] Processing Table {table_ix + 1}: {len(table_df)} rows, {len(table_df.columns)} columns")
-            csv_filename = f"{doc_filename}-table-{table_ix + 1}.csv"
-            element_csv_path = docling_dir / csv_filename
-            table_df.to_csv(element_csv_path, index=False)
-            _log.info(f"[Docling] Saved CSV: {element_csv_path}")
-            html_filename = f"{doc_filename}-table-{table_ix + 1}.html"
-            element_html_path = docling_dir / html_filename
-            try:
-                html_content = table.export_to_html(doc=conv_res.document)
-                styled_html = f"""<!DOCTYPE html>\n<html lang=\"en\">\n<head>\n    <meta charset=\"UTF-8\">\n    <meta name=\"viewport\" content=\"width=device-width, initial-scale=1.0\">\n    <title>Table {table_ix + 1} - {doc_filename}</title>\n    <style>\n        body {{\n            font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;\n            margin: 20px;\n            background-color: #f5f5f5;\n        }}\n        .container {{\n            max-width: 1200px;\n            margin: 0 auto;\n            background: white;\n            padding: 20px;\n            border-radius: 8px;\n            box-shadow: 0 2px 10px rgba(0,0,0,0.1);\n        }}\n        h1 {{\n            color: #333;\n            border-bottom: 3px solid #667eea;\n            padding-bottom: 10px;\n        }}\n        table {{\n            border-collapse: collapse;\n            width: 100%;\n            margin-top: 20px;\n        }}\n        th {{\n            background: #667eea;\n            color: white;\n            padding: 12px;\n            text-align: left;\n        }}\n        td {{\n            border: 1px solid #ddd;\n            padding: 10px;\n        }}\n        tr:nth-child(even) {{\n            background-color: #f9f9f9;\n        }}\n        tr:hover {{\n            background-color: #f5f5f5;\n        }}\n        .stats {{\n            background: #f8f9fa;\n            padding: 15px;\n            border-radius: 6px;\n            margin-bottom: 20px;\n        }}\n    </style>\n</head>\n<body>\n    <div class=\"container\">\n        <h1>📊 Table {table_ix + 1}</h1>\n        <div class=\"stats\">\n            <strong>Document:</strong> {doc_filename}<br>\n            <strong>Rows:</strong> {len(table_df)} | \n            <strong>Columns:</strong> {len(table_df.columns)} | \n            <strong>Generated:</strong> {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n        </div>\n        {html_content}\n    </div>\n</body>\n</html>"""
-                with open(element_html_path, "w", encoding="utf-8") as fp:
-                    fp.write(styled_html)
-            except Exception as e:
-                _log.warning(f"[Docling] DocumentConverter HTML export failed: {e}. Using pandas fallback.")
-                fallback_html = f"""<!DOCTYPE html>\n<html><head><title>Table {table_ix + 1}</title></head>\n<body><h1>Table {table_ix + 1} - {doc_filename}</h1>\n{table_df.to_html(index=False)}</body></html>"""
-                with open(element_html_path, "w", encoding="utf-8") as fp:
-                    fp.write(fallback_html)
-            _log.info(f"[Docling] Saved HTML: {element_html_path}")
-            tables_info.append(TableInfo(
-                table_index=table_ix,
-                csv_path=str(element_csv_path.absolute()),
-                html_path=str(element_html_path.absolute()),
-                rows=len(table_df),
-                columns=len(table_df.columns),
-                filename_csv=csv_filename,
-                filename_html=html_filename
-            ))
+        def record_table(table_ix: int, info) -> None:
+            if checkpoint is not None:
+                checkpoint.record_deferred("docling", "table", table_ix, info, sync_dir=docling_dir)
+        with TableExporter(profiler, on_result=record_table) as exporter:
+            for table_ix, table in enumerate(document.tables):
+                progress = 30 + int((table_ix / total_tables) * 60)
+                jobs_db[job_id]["progress"] = progress
+                jobs_db[job_id]["message"] = f"Processing table {table_ix + 1}/{total_tables}..."
+                if checkpoint is not None and checkpoint.has("docling", "table", table_ix):
+                    exporter.add_completed(checkpoint.get("docling", "table", table_ix))
+                    continue
+                if not exporter.uses_processes:
+                    exporter.submit(export_docling_table, table, document, table_ix, doc_filename, docling_dir, _log, key=table_ix)
+                    continue
+                # Docling objects stay in this process; only the CSV/HTML writing is shipped to the pool.
+                with profile_stage(profiler, "export_dataframe"):
+                    table_df: pd.DataFrame = table.export_to_dataframe()
+                if table_df.empty:
+                    _log.warning(f"[Docling] Table {table_ix} is empty, skipping...")
+                    record_table(table_ix, None)
+                    continue
+                html_content, html_error = docling_table_html(table, document, profiler)
+                exporter.submit(write_docling_table, table_df, html_content, html_error, table_ix, doc_filename, docling_dir, _log, key=table_ix)
+            tables_info = [TableInfo(**info) for info in exporter.results() if info is not None]
         processing_time = time.time() - start_time
         jobs_db[job_id]["status"] = "completed"
         jobs_db[job_id]["progress"] = 100
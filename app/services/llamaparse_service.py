@@ -11,6 +11,7 @@ from typing import Any, Dict, List
 from openai import OpenAI
 from llama_parse import LlamaParse
 from app.core.config import settings
+from app.utils.profiling import profile_stage
 
 # Initialize OpenAI client
 openai_client = OpenAI(api_key=settings.openai_api_key)
@@ -62,7 +63,9 @@ def extract_tables_llamaparse(
     jobs_db: Dict[str, Any],
     TableInfo,
     ExtractionResult,
-    _log: logging.Logger
+    _log: logging.Logger,
+    profiler=None,
+    checkpoint=None
 ) -> object:
     """
     Extract tables from document using LlamaParse + OpenAI and save as HTML.
@@ -74,6 +77,9 @@ def extract_tables_llamaparse(
         TableInfo: Pydantic model for table info.
         ExtractionResult: Pydantic model for extraction result.
         _log (logging.Logger): Logger instance.
+        profiler (JobProfiler, optional): Records per-stage timings when profiling is enabled.
+        checkpoint (JobCheckpoint, optional): Journal used to skip the LlamaParse call and
+            sections already sent to OpenAI by an interrupted run of this job.
     Returns:
         ExtractionResult: Extraction result object.
     Raises:
@@ -101,24 +107,38 @@ def extract_tables_llamaparse(
         )
         jobs_db[job_id]["progress"] = 20
         jobs_db[job_id]["message"] = "Processing document with LlamaParse..."
-        # Parse the document
-        file_name = os.path.basename(input_file_path)
-        extra_info = {"file_name": file_name}
-        with open(input_file_path, "rb") as f:
-            documents = parser.load_data(f, extra_info=extra_info)
-        _log.info(f"[LlamaParse] Extracted {len(documents)} document sections")
+        section_texts = checkpoint.load_json("llamaparse", "sections") if checkpoint is not None else None
+        if section_texts is not None:
+            _log.info(f"[LlamaParse] Resuming job {job_id} from checkpointed sections")
+        else:
+            # Parse the document
+            file_name = os.path.basename(input_file_path)
+            extra_info = {"file_name": file_name}
+            with profile_stage(profiler, "load_data"), open(input_file_path, "rb") as f:
+                documents = parser.load_data(f, extra_info=extra_info)
+            section_texts = [doc.text for doc in documents]
+            if checkpoint is not None:
+                checkpoint.save_json("llamaparse", "sections", section_texts)
+        _log.info(f"[LlamaParse] Extracted {len(section_texts)} document sections")
         jobs_db[job_id]["progress"] = 40
-        jobs_db[job_id]["message"] = f"Found {len(documents)} document sections. Processing with OpenAI..."
+        jobs_db[job_id]["message"] = f"Found {len(section_texts)} document sections. Processing with OpenAI..."
         doc_filename = Path(input_file_path).stem
         all_tables: List[dict] = []
         table_counter = 0
         # Process each document section
-        for doc_idx, doc in enumerate(documents):
-            progress = 40 + int((doc_idx / len(documents)) * 50)
+        for doc_idx, section_text in enumerate(section_texts):
+            progress = 40 + int((doc_idx / len(section_texts)) * 50)
             jobs_db[job_id]["progress"] = progress
-            jobs_db[job_id]["message"] = f"Processing section {doc_idx + 1}/{len(documents)} with OpenAI..."
-            # Extract tables using OpenAI
-            html_content = extract_tables_with_openai(doc.text)
+            jobs_db[job_id]["message"] = f"Processing section {doc_idx + 1}/{len(section_texts)} with OpenAI..."
+            # Extract tables using OpenAI, reusing the response of an interrupted run.
+            # Writing the section's files is cheap and deterministic, so it is simply redone.
+            if checkpoint is not None and checkpoint.has("llamaparse", "section", doc_idx):
+                html_content = checkpoint.get("llamaparse", "section", doc_idx)
+            else:
+                with profile_stage(profiler, "openai"):
+                    html_content = extract_tables_with_openai(section_text)
+                if checkpoint is not None and html_content != "ERROR_PROCESSING":
+                    checkpoint.record("llamaparse", "section", doc_idx, html_content)
             if html_content == "NO_TABLES_FOUND":
                 _log.info(f"[LlamaParse] No tables found in document section {doc_idx + 1}")
                 continue
@@ -140,10 +160,11 @@ def extract_tables_llamaparse(
             # Save each table as HTML file
             for table_html in tables_in_section:
                 table_counter += 1
-                styled_html = f"""<!DOCTYPE html>\n<html lang=\"en\">\n<head>\n    <meta charset=\"UTF-8\">\n    <meta name=\"viewport\" content=\"width=device-width, initial-scale=1.0\">\n    <title>Table {table_counter} - {doc_filename}</title>\n    <style>\n        body {{\n            font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;\n            margin: 20px;\n            background-color: #f5f5f5;\n        }}\n        .container {{\n            max-width: 1200px;\n            margin: 0 auto;\n            background: white;\n            padding: 20px;\n            border-radius: 8px;\n            box-shadow: 0 2px 10px rgba(0,0,0,0.1);\n        }}\n        h1 {{\n            color: #333;\n            border-bottom: 3px solid #667eea;\n            padding-bottom: 10px;\n        }}\n        table {{\n            border-collapse: collapse;\n            width: 100%;\n            margin-top: 20px;\n        }}\n        th {{\n            background: #667eea;\n            color: white;\n            padding: 12px;\n            text-align: left;\n        }}\n        td {{\n            border: 1px solid #ddd;\n            padding: 10px;\n        }}\n        tr:nth-child(even) {{\n            background-color: #f9f9f9;\n        }}\n        tr:hover {{\n            background-color: #f5f5f5;\n        }}\n        .stats {{\n            background: #f8f9fa;\n            padding: 15px;\n            border-radius: 6px;\n            margin-bottom: 20px;\n        }}\n    </style>\n</head>\n<body>\n    <div class=\"container\">\n        <h1>📊 Table {table_counter}</h1>\n        <div class=\"stats\">\n            <strong>Document:</strong> {doc_filename}<br>\n            <strong>Section:</strong> {doc_idx + 1} | \n            <strong>Generated:</strong> {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n        </div>\n        {table_html}\n    </div>\n</body>\n</html>"""
+                with profile_stage(profiler, "render_html"):
+                    styled_html = f"""<!DOCTYPE html>\n<html lang=\"en\">\n<head>\n    <meta charset=\"UTF-8\">\n    <meta name=\"viewport\" content=\"width=device-width, initial-scale=1.0\">\n    <title>Table {table_counter} - {doc_filename}</title>\n    <style>\n        body {{\n            font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;\n            margin: 20px;\n            background-color: #f5f5f5;\n        }}\n        .container {{\n            max-width: 1200px;\n            margin: 0 auto;\n            background: white;\n            padding: 20px;\n            border-radius: 8px;\n            box-shadow: 0 2px 10px rgba(0,0,0,0.1);\n        }}\n        h1 {{\n            color: #333;\n            border-bottom: 3px solid #667eea;\n            padding-bottom: 10px;\n        }}\n        table {{\n            border-collapse: collapse;\n            width: 100%;\n            margin-top: 20px;\n        }}\n        th {{\n            background: #667eea;\n            color: white;\n            padding: 12px;\n            text-align: left;\n        }}\n        td {{\n            border: 1px solid #ddd;\n            padding: 10px;\n        }}\n        tr:nth-child(even) {{\n            background-color: #f9f9f9;\n        }}\n        tr:hover {{\n            background-color: #f5f5f5;\n        }}\n        .stats {{\n            background: #f8f9fa;\n            padding: 15px;\n            border-radius: 6px;\n            margin-bottom: 20px;\n        }}\n    </style>\n</head>\n<body>\n    <div class=\"container\">\n        <h1>📊 Table {table_counter}</h1>\n        <div class=\"stats\">\n            <strong>Document:</strong> {doc_filename}<br>\n            <strong>Section:</strong> {doc_idx + 1} | \n            <strong>Generated:</strong> {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n        </div>\n        {table_html}\n    </div>\n</body>\n</html>"""
                 html_filename = f"{doc_filename}-table-{table_counter}.html"
                 html_path = llamaparse_dir / html_filename
-                with open(html_path, "w", encoding="utf-8") as f:
+                with profile_stage(profiler, "write_html"), open(html_path, "w", encoding="utf-8") as f:
                     f.write(styled_html)
                 _log.info(f"[LlamaParse] Saved HTML table: {html_path}")
                 table_info = {
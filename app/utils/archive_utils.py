@@ -0,0 +1,192 @@
+"""
+Streaming zip archives built on the fly from a job output directory.
+"""
+import hashlib
+import threading
+import zipfile
+from collections import OrderedDict
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, Tuple
+from app.core.checkpoint import JOURNAL_FILE, SPEC_FILE
+
+# Formats that are already compressed (xlsx is itself a zip) are stored as-is.
+STORED_SUFFIXES = {".xlsx", ".zip", ".gz", ".png", ".jpg", ".jpeg", ".gif", ".pdf"}
+COMPRESS_LEVEL = 6
+READ_CHUNK_SIZE = 256 * 1024
+# Job bookkeeping kept at the top of the job directory, not part of the outputs.
+INTERNAL_FILES = {JOURNAL_FILE, SPEC_FILE}
+
+_size_cache: "OrderedDict[str, int]" = OrderedDict()
+_size_cache_lock = threading.Lock()
+_SIZE_CACHE_MAX = 128
+
+
+class ArchiveEntry:
+    """A file to be written into the archive."""
+    def __init__(self, path: Path, arcname: str):
+        stat = path.stat()
+        self.path = path
+        self.arcname = arcname
+        self.size = stat.st_size
+        self.mtime_ns = stat.st_mtime_ns
+
+    @property
+    def compress_type(self) -> int:
+        if self.path.suffix.lower() in STORED_SUFFIXES:
+            return zipfile.ZIP_STORED
+        return zipfile.ZIP_DEFLATED
+
+    def zip_info(self) -> zipfile.ZipInfo:
+        zinfo = zipfile.ZipInfo.from_file(self.path, self.arcname, strict_timestamps=False)
+        zinfo.compress_type = self.compress_type
+        return zinfo
+
+
+def collect_entries(
+    job_dir: Path,
+    backends: Optional[Iterable[str]] = None,
+    formats: Optional[Iterable[str]] = None
+) -> List[ArchiveEntry]:
+    """
+    List the files of a job directory in a stable order.
+    Args:
+        job_dir (Path): The job_<id> directory.
+        backends (Iterable[str], optional): Only include these backend subfolders.
+            Files at the top of the job directory are only included when unset.
+        formats (Iterable[str], optional): Only include these extensions (e.g. "csv", "html").
+    Returns:
+        List[ArchiveEntry]: Entries sorted by archive name.
+    """
+    backend_set = {b.lower() for b in backends} if backends else None
+    format_set = {f.lower().lstrip(".") for f in formats} if formats else None
+    entries = []
+    for path in sorted(job_dir.rglob("*")):
+        if not path.is_file():
+            continue
+        rel = path.relative_to(job_dir)
+        if any(part.startswith(".") for part in rel.parts) or rel.as_posix() in INTERNAL_FILES:
+            # Internal checkpoint artifacts
+            continue
+        if backend_set is not None and (len(rel.parts) < 2 or rel.parts[0].lower() not in backend_set):
+            continue
+        if format_set is not None and path.suffix.lower().lstrip(".") not in format_set:
+            continue
+        entries.append(ArchiveEntry(path, rel.as_posix()))
+    return entries
+
+
+def archive_etag(entries: List[ArchiveEntry]) -> str:
+    """
+    Compute a strong ETag from the archive manifest. The archive bytes are a
+    deterministic function of the manifest, so the ETag identifies them.
+    """
+    digest = hashlib.sha256(f"level={COMPRESS_LEVEL}".encode())
+    for entry in entries:
+        digest.update(f"\0{entry.arcname}\0{entry.size}\0{entry.mtime_ns}\0{entry.compress_type}".encode())
+    return f'"{digest.hexdigest()[:32]}"'
+
+
+class _StreamSink:
+    """Unseekable file object that hands written bytes back to the generator."""
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def iter_zip(entries: List[ArchiveEntry], chunk_size: int = READ_CHUNK_SIZE) -> Iterator[bytes]:
+    """
+    Yield a zip archive of `entries` piece by piece. At most one read chunk
+    (plus its compressed output) is held in memory at any time.
+    """
+    sink = _StreamSink()
+    with zipfile.ZipFile(sink, "w", compresslevel=COMPRESS_LEVEL) as zf:
+        for entry in entries:
+            with open(entry.path, "rb") as src, zf.open(entry.zip_info(), "w") as dest:
+                while True:
+                    data = src.read(chunk_size)
+                    if not data:
+                        break
+                    dest.write(data)
+                    out = sink.drain()
+                    if out:
+                        yield out
+            out = sink.drain()
+            if out:
+                yield out
+    out = sink.drain()
+    if out:
+        yield out
+
+
+def archive_size(entries: List[ArchiveEntry], etag: str) -> int:
+    """
+    Total archive length in bytes, computed by a counting pass and cached per ETag.
+    """
+    with _size_cache_lock:
+        if etag in _size_cache:
+            _size_cache.move_to_end(etag)
+            return _size_cache[etag]
+    total = sum(len(chunk) for chunk in iter_zip(entries))
+    with _size_cache_lock:
+        _size_cache[etag] = total
+        while len(_size_cache) > _SIZE_CACHE_MAX:
+            _size_cache.popitem(last=False)
+    return total
+
+
+def slice_stream(stream: Iterable[bytes], start: int, end: int) -> Iterator[bytes]:
+    """
+    Yield only bytes [start, end] (inclusive) of a byte stream.
+    """
+    position = 0
+    for chunk in stream:
+        chunk_end = position + len(chunk)
+        if chunk_end > start:
+            yield chunk[max(start - position, 0):end + 1 - position]
+        position = chunk_end
+        if position > end:
+            break
+
+
+def parse_range(header: str, total: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a single `bytes=` range against the total length.
+    Returns:
+        (start, end) inclusive, or None if the header is malformed or not a single
+        byte range, in which case it is ignored and the full archive is sent.
+    Raises:
+        ValueError: If the range is well-formed but unsatisfiable.
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, sep, last = spec.strip().partition("-")
+    first, last = first.strip(), last.strip()
+    if not sep or not (first or last):
+        return None
+    if (first and not first.isdigit()) or (last and not last.isdigit()):
+        return None
+    if not first:
+        suffix = int(last)
+        if suffix == 0:
+            raise ValueError(f"Unsatisfiable range: {header}")
+        return max(total - suffix, 0), total - 1
+    start = int(first)
+    if last and int(last) < start:
+        # RFC 9110 treats first-pos > last-pos as an invalid range.
+        return None
+    end = int(last) if last else total - 1
+    if start >= total:
+        raise ValueError(f"Unsatisfiable range: {header}")
+    return start, min(end, total - 1)
@@ -0,0 +1,247 @@
+"""
+On-demand per-job profiling: a sampling CPU profiler plus tracemalloc, split by stage.
+Nothing here runs unless a JobProfiler is created for the job.
+"""
+import contextlib
+import json
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Dict, List, Optional
+
+_NULL_STAGE = contextlib.nullcontext()
+_active_lock = threading.Lock()
+
+
+def profile_stage(profiler: Optional["JobProfiler"], name: str, snapshot: bool = False):
+    """
+    Return a context manager timing `name` under `profiler`, or a no-op if profiling is off.
+    """
+    if profiler is None:
+        return _NULL_STAGE
+    return profiler.stage(name, snapshot=snapshot)
+
+
+class _StageStats:
+    def __init__(self):
+        self.calls = 0
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.peak_bytes = 0
+        self.allocated_bytes = 0
+        self.top_allocators: List[dict] = []
+
+    def to_dict(self) -> dict:
+        data = {
+            "calls": self.calls,
+            "wall_seconds": round(self.wall, 6),
+            "cpu_seconds": round(self.cpu, 6),
+            "peak_bytes": self.peak_bytes,
+            "allocated_bytes": self.allocated_bytes,
+        }
+        if self.top_allocators:
+            data["top_allocators"] = self.top_allocators
+        return data
+
+
+class JobProfiler:
+    """
+    Profile a single job running on the calling thread.
+    A background thread samples the job thread's stack every `interval` seconds
+    (wall-clock, so time spent waiting on remote APIs is included), and tracemalloc
+    records peak memory per stage. tracemalloc and the sampler are process-wide and
+    slow down every running thread, so only one job can be profiled at a time and
+    the caller must keep other jobs from running alongside it (see job_registry.start_job).
+    Stages may also be entered from worker threads (e.g. the table export pool);
+    they nest under the job thread's current stage, and their peak memory is
+    approximate since peaks are tracked process-wide.
+    """
+    def __init__(self, job_id: str, interval: float = 0.005, top_n: int = 15, trace_frames: int = 10):
+        self.job_id = job_id
+        self.interval = interval
+        self.top_n = top_n
+        self.trace_frames = trace_frames
+        self.stages: Dict[str, _StageStats] = defaultdict(_StageStats)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._stage_paths: Dict[int, str] = {}
+        self._target_thread = 0
+        self._samples: Counter = Counter()
+        self._sample_count = 0
+        self._stop_event = threading.Event()
+        self._sampler: Optional[threading.Thread] = None
+        self._owns_tracemalloc = False
+        self._start_wall = 0.0
+        self._start_cpu = 0.0
+        self._peak_bytes = 0
+        self._result: Optional[dict] = None
+
+    def start(self) -> "JobProfiler":
+        """
+        Start tracing. Raises RuntimeError if another job is being profiled.
+        """
+        if not _active_lock.acquire(blocking=False):
+            raise RuntimeError("Another job is already being profiled.")
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.trace_frames)
+            self._owns_tracemalloc = True
+        tracemalloc.reset_peak()
+        self._target_thread = threading.get_ident()
+        self._start_wall = time.perf_counter()
+        self._start_cpu = time.thread_time()
+        self._sampler = threading.Thread(target=self._sample_loop, name=f"profiler-{self.job_id}", daemon=True)
+        self._sampler.start()
+        return self
+
+    def _sample_loop(self) -> None:
+        while not self._stop_event.wait(self.interval):
+            frames = sys._current_frames()
+            stage_paths = dict(self._stage_paths)
+            stage_paths.setdefault(self._target_thread, "")
+            for thread_id, stage_path in stage_paths.items():
+                frame = frames.get(thread_id)
+                if frame is None:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.reverse()
+                self._samples[(stage_path, tuple(stack))] += 1
+            self._sample_count += 1
+
+    def _thread_stack(self) -> List[list]:
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    @contextlib.contextmanager
+    def stage(self, name: str, snapshot: bool = False):
+        """
+        Time a stage. Stages nest, and are reported by their path (e.g. "docling/convert").
+        With `snapshot`, the top allocating lines of the stage are recorded too.
+        """
+        thread_id = threading.get_ident()
+        stack = self._thread_stack()
+        if stack:
+            parent_path = stack[-1][0]
+        else:
+            # Worker threads nest under whatever the job thread is doing.
+            parent_path = self._stage_paths.get(self._target_thread, "")
+        current, peak = tracemalloc.get_traced_memory()
+        if stack:
+            stack[-1][1] = max(stack[-1][1], peak)
+        tracemalloc.reset_peak()
+        path = f"{parent_path}/{name}" if parent_path else name
+        before = tracemalloc.take_snapshot() if snapshot else None
+        # [path, peak seen, memory at entry]
+        entry = [path, current, current]
+        stack.append(entry)
+        self._stage_paths[thread_id] = path
+        wall_start = time.perf_counter()
+        cpu_start = time.thread_time()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - wall_start
+            cpu = time.thread_time() - cpu_start
+            current_end, peak = tracemalloc.get_traced_memory()
+            stack.pop()
+            if stack:
+                self._stage_paths[thread_id] = stack[-1][0]
+            else:
+                self._stage_paths.pop(thread_id, None)
+            stage_peak = max(entry[1], peak)
+            if stack:
+                stack[-1][1] = max(stack[-1][1], stage_peak)
+            with self._lock:
+                self._peak_bytes = max(self._peak_bytes, stage_peak)
+                stats = self.stages[path]
+                stats.calls += 1
+                stats.wall += wall
+                stats.cpu += cpu
+                stats.peak_bytes = max(stats.peak_bytes, stage_peak - entry[2])
+                stats.allocated_bytes += max(current_end - entry[2], 0)
+            if before is not None:
+                after = tracemalloc.take_snapshot()
+                stats.top_allocators = [
+                    {"location": str(diff.traceback[0]), "size_diff_bytes": diff.size_diff, "count_diff": diff.count_diff}
+                    for diff in after.compare_to(before, "lineno")[:self.top_n]
+                ]
+
+    def stop(self) -> dict:
+        """
+        Stop tracing and return the profile report.
+        """
+        if self._result is not None:
+            return self._result
+        self._stop_event.set()
+        if self._sampler is not None:
+            self._sampler.join()
+        _, peak = tracemalloc.get_traced_memory()
+        top = tracemalloc.take_snapshot().statistics("lineno")[:self.top_n]
+        if self._owns_tracemalloc:
+            tracemalloc.stop()
+        _active_lock.release()
+
+        self_samples: Counter = Counter()
+        cumulative_samples: Counter = Counter()
+        stage_samples: Counter = Counter()
+        for (stage_path, stack), count in self._samples.items():
+            stage_samples[stage_path or "<unstaged>"] += count
+            if stack:
+                self_samples[stack[-1]] += count
+            for func in set(stack):
+                cumulative_samples[func] += count
+        self._result = {
+            "job_id": self.job_id,
+            "wall_seconds": round(time.perf_counter() - self._start_wall, 6),
+            "cpu_seconds": round(time.thread_time() - self._start_cpu, 6),
+            "peak_bytes": max(self._peak_bytes, peak),
+            "sample_interval_seconds": self.interval,
+            "samples": self._sample_count,
+            "stages": {path: stats.to_dict() for path, stats in sorted(self.stages.items())},
+            "samples_by_stage": dict(stage_samples.most_common()),
+            "top_self": [{"function": f, "samples": n} for f, n in self_samples.most_common(self.top_n)],
+            "top_cumulative": [{"function": f, "samples": n} for f, n in cumulative_samples.most_common(self.top_n)],
+            "top_allocators": [
+                {"location": str(stat.traceback[0]), "size_bytes": stat.size, "count": stat.count}
+                for stat in top
+            ],
+        }
+        return self._result
+
+    def write(self, output_dir: Path) -> Path:
+        """
+        Write profile.json and profile.folded (collapsed stacks, for flame graph tools) to `output_dir`.
+        """
+        report = self.stop()
+        output_dir.mkdir(parents=True, exist_ok=True)
+        with open(output_dir / "profile.json", "w", encoding="utf-8") as fp:
+            json.dump(report, fp, indent=2)
+        with open(output_dir / "profile.folded", "w", encoding="utf-8") as fp:
+            for (stage_path, stack), count in sorted(self._samples.items()):
+                frames = [f"[{part}]" for part in stage_path.split("/") if part] + list(stack)
+                fp.write(";".join(f.replace(";", ",") for f in frames) + f" {count}\n")
+        return output_dir / "profile.json"
+
+    def summary(self, limit: int = 10) -> dict:
+        """
+        Short summary for the API response: totals and the slowest stages.
+        """
+        report = self.stop()
+        slowest = sorted(report["stages"].items(), key=lambda kv: kv[1]["wall_seconds"], reverse=True)[:limit]
+        return {
+            "wall_seconds": report["wall_seconds"],
+            "cpu_seconds": report["cpu_seconds"],
+            "peak_bytes": report["peak_bytes"],
+            "samples": report["samples"],
+            "slowest_stages": {
+                path: {k: v for k, v in stats.items() if k != "top_allocators"} for path, stats in slowest
+            },
+        }
@@ -0,0 +1,247 @@
+"""
+Per-table export stage shared by the extraction services.
+Tables are rendered and written on a configurable thread or process pool; results
+come back in submission order, so file naming and table ordering stay deterministic.
+The task functions only take picklable arguments (apart from Docling's table objects
+in thread mode) so they can run in a process pool without importing the API clients.
+"""
+import logging
+import multiprocessing
+import threading
+from collections import deque
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from datetime import datetime
+from io import StringIO
+from pathlib import Path
+from typing import Any, Callable, Deque, List, Optional, Tuple
+import pandas as pd
+from app.core.checkpoint import fsync_path
+from app.core.config import settings
+from app.utils.profiling import profile_stage
+
+_executor: Optional[Executor] = None
+_executor_lock = threading.Lock()
+
+
+def get_export_executor() -> Optional[Executor]:
+    """
+    Return the shared export pool, creating it on first use. None when export_workers is 0.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None and settings.export_workers > 0:
+            if settings.export_executor == "process":
+                # Forking this multi-threaded process can deadlock on locks held by other
+                # threads (e.g. logging handlers), so workers are spawned fresh.
+                _executor = ProcessPoolExecutor(
+                    max_workers=settings.export_workers,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+            else:
+                _executor = ThreadPoolExecutor(max_workers=settings.export_workers, thread_name_prefix="table-export")
+        return _executor
+
+
+def shutdown_export_executor(wait_for_tasks: bool = True) -> None:
+    """
+    Shut down the shared export pool (called on application shutdown).
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=wait_for_tasks, cancel_futures=not wait_for_tasks)
+            _executor = None
+
+
+class TableExporter:
+    """
+    Submit per-table export tasks for one job and collect their results in order.
+    At most 2 * export_workers tasks are in flight, which bounds the number of
+    tables (DataFrames and rendered HTML) held in memory at once. If `on_result`
+    is given, it is called on the submitting thread as each keyed task's result
+    is collected (e.g. to checkpoint finished tables).
+    """
+    def __init__(self, profiler=None, on_result: Optional[Callable[[Any, Any], None]] = None):
+        self._executor = get_export_executor()
+        self.uses_processes = isinstance(self._executor, ProcessPoolExecutor)
+        # The profiler cannot cross into worker processes.
+        self._profiler = None if self.uses_processes else profiler
+        self._max_pending = max(2 * settings.export_workers, 1)
+        self._on_result = on_result
+        self._pending: Deque[Tuple[Any, Future]] = deque()
+        self._results: List[Any] = []
+
+    def _collect(self, key, future: Future) -> None:
+        result = future.result()
+        if key is not None and self._on_result is not None:
+            self._on_result(key, result)
+        self._results.append(result)
+
+    def submit(self, fn: Callable, *args, key=None) -> None:
+        if self._executor is None:
+            future: Future = Future()
+            future.set_result(fn(*args, profiler=self._profiler))
+            self._collect(key, future)
+            return
+        self._pending.append((key, self._executor.submit(fn, *args, profiler=self._profiler)))
+        while len(self._pending) > self._max_pending:
+            self._collect(*self._pending.popleft())
+
+    def add_completed(self, result) -> None:
+        """
+        Slot in the result of a table finished earlier (e.g. restored from a checkpoint).
+        """
+        future: Future = Future()
+        future.set_result(result)
+        if self._pending:
+            self._pending.append((None, future))
+        else:
+            self._results.append(result)
+
+    def results(self) -> List[Any]:
+        """
+        Wait for all submitted tasks and return their results in submission order.
+        """
+        while self._pending:
+            self._collect(*self._pending.popleft())
+        return self._results
+
+    def __enter__(self) -> "TableExporter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        # On failure, drop queued tables and let running ones finish before returning.
+        # Cancelled futures never complete, so only wait on those that could not be cancelled.
+        wait([future for _, future in self._pending if not future.cancel()])
+        self._pending.clear()
+
+
+def docling_table_html(table, doc, profiler=None) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Export a Docling table to HTML. Returns (html_content, None) or (None, error message).
+    """
+    try:
+        with profile_stage(profiler, "export_html"):
+            return table.export_to_html(doc=doc), None
+    except Exception as e:
+        return None, str(e)
+
+
+def export_docling_table(
+    table,
+    doc,
+    table_ix: int,
+    doc_filename: str,
+    docling_dir: Path,
+    _log: logging.Logger,
+    profiler=None
+) -> Optional[dict]:
+    """
+    Export one Docling table to CSV/HTML. Used when tables are exported in-process.
+    Returns:
+        dict: TableInfo fields, or None if the table is empty.
+    """
+    with profile_stage(profiler, "export_dataframe"):
+        table_df: pd.DataFrame = table.export_to_dataframe()
+    if table_df.empty:
+        _log.warning(f"[Docling] Table {table_ix} is empty, skipping...")
+        return None
+    html_content, html_error = docling_table_html(table, doc, profiler)
+    return write_docling_table(table_df, html_content, html_error, table_ix, doc_filename, docling_dir, _log, profiler=profiler)
+
+
+def write_docling_table(
+    table_df: pd.DataFrame,
+    html_content: Optional[str],
+    html_error: Optional[str],
+    table_ix: int,
+    doc_filename: str,
+    docling_dir: Path,
+    _log: logging.Logger,
+    profiler=None
+) -> dict:
+    """
+    Write a Docling table as CSV and styled HTML, falling back to pandas HTML
+    if Docling's HTML export failed.
+    Returns:
+        dict: TableInfo fields.
+    """
+    _log.info(f"[Docling] Processing Table {table_ix + 1}: {len(table_df)} rows, {len(table_df.columns)} columns")
+    csv_filename = f"{doc_filename}-table-{table_ix + 1}.csv"
+    element_csv_path = docling_dir / csv_filename
+    with profile_stage(profiler, "to_csv"):
+        table_df.to_csv(element_csv_path, index=False)
+    _log.info(f"[Docling] Saved CSV: {element_csv_path}")
+    html_filename = f"{doc_filename}-table-{table_ix + 1}.html"
+    element_html_path = docling_dir / html_filename
+    if html_content is not None:
+        try:
+            with profile_stage(profiler, "render_html"):
+                styled_html = f"""<!DOCTYPE html>\n<html lang=\"en\">\n<head>\n    <meta charset=\"UTF-8\">\n    <meta name=\"viewport\" content=\"width=device-width, initial-scale=1.0\">\n    <title>Table {table_ix + 1} - {doc_filename}</title>\n    <style>\n        body {{\n            font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;\n            margin: 20px;\n            background-color: #f5f5f5;\n        }}\n        .container {{\n            max-width: 1200px;\n            margin: 0 auto;\n            background: white;\n            padding: 20px;\n            border-radius: 8px;\n            box-shadow: 0 2px 10px rgba(0,0,0,0.1);\n        }}\n        h1 {{\n            color: #333;\n            border-bottom: 3px solid #667eea;\n            padding-bottom: 10px;\n        }}\n        table {{\n            border-collapse: collapse;\n            width: 100%;\n            margin-top: 20px;\n        }}\n        th {{\n            background: #667eea;\n            color: white;\n            padding: 12px;\n            text-align: left;\n        }}\n        td {{\n            border: 1px solid #ddd;\n            padding: 10px;\n        }}\n        tr:nth-child(even) {{\n            background-color: #f9f9f9;\n        }}\n        tr:hover {{\n            background-color: #f5f5f5;\n        }}\n        .stats {{\n            background: #f8f9fa;\n            padding: 15px;\n            border-radius: 6px;\n            margin-bottom: 20px;\n        }}\n    </style>\n</head>\n<body>\n    <div class=\"container\">\n        <h1>📊 Table {table_ix + 1}</h1>\n        <div class=\"stats\">\n            <strong>Document:</strong> {doc_filename}<br>\n            <strong>Rows:</strong> {len(table_df)} | \n            <strong>Columns:</strong> {len(table_df.columns)} | \n            <strong>Generated:</strong> {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n        </div>\n        {html_content}\n    </div>\n</body>\n</html>"""
+            with profile_stage(profiler, "write_html"), open(element_html_path, "w", encoding="utf-8") as fp:
+                fp.write(styled_html)
+        except Exception as e:
+            html_content, html_error = None, str(e)
+    if html_content is None:
+        _log.warning(f"[Docling] DocumentConverter HTML export failed: {html_error}. Using pandas fallback.")
+        fallback_html = f"""<!DOCTYPE html>\n<html><head><title>Table {table_ix + 1}</title></head>\n<body><h1>Table {table_ix + 1} - {doc_filename}</h1>\n{table_df.to_html(index=False)}</body></html>"""
+        with open(element_html_path, "w", encoding="utf-8") as fp:
+            fp.write(fallback_html)
+    _log.info(f"[Docling] Saved HTML: {element_html_path}")
+    # Make the files durable before the table is checkpointed as done.
+    with profile_stage(profiler, "fsync"):
+        fsync_path(element_csv_path)
+        fsync_path(element_html_path)
+    return dict(
+        table_index=table_ix,
+        csv_path=str(element_csv_path.absolute()),
+        html_path=str(element_html_path.absolute()),
+        rows=len(table_df),
+        columns=len(table_df.columns),
+        filename_csv=csv_filename,
+        filename_html=html_filename
+    )
+
+
+def export_unstructured_table(
+    table_data: dict,
+    table_ix: int,
+    doc_filename: str,
+    unstructured_dir: Path,
+    _log: logging.Logger,
+    profiler=None
+) -> Optional[str]:
+    """
+    Write an Unstructured table as styled HTML and convert it to Excel.
+    Returns:
+        str: Path of the Excel file, or None if the HTML could not be converted.
+    """
+    html_filename = f"{doc_filename}-table-{table_ix + 1}.html"
+    element_html_path = unstructured_dir / html_filename
+    with profile_stage(profiler, "render_html"):
+        styled_html = f"""<!DOCTYPE html>\n<html lang=\"en\">\n<head>\n    <meta charset=\"UTF-8\">\n    <meta name=\"viewport\" content=\"width=device-width, initial-scale=1.0\">\n    <title>Table {table_ix + 1} - {doc_filename}</title>\n    <style>\n        body {{\n            font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;\n            margin: 20px;\n            background-color: #f5f5f5;\n        }}\n        .container {{\n            max-width: 1200px;\n            margin: 0 auto;\n            background: white;\n            padding: 20px;\n            border-radius: 8px;\n            box-shadow: 0 2px 10px rgba(0,0,0,0.1);\n        }}\n        h1 {{\n            color: #333;\n            border-bottom: 3px solid #667eea;\n            padding-bottom: 10px;\n        }}\n        table {{\n            border-collapse: collapse;\n            width: 100%;\n            margin-top: 20px;\n        }}\n        th {{\n            background: #667eea;\n            color: white;\n            padding: 12px;\n            text-align: left;\n        }}\n        td {{\n            border: 1px solid #ddd;\n            padding: 10px;\n        }}\n        tr:nth-child(even) {{\n            background-color: #f9f9f9;\n        }}\n        tr:hover {{\n            background-color: #f5f5f5;\n        }}\n        .stats {{\n            background: #f8f9fa;\n            padding: 15px;\n            border-radius: 6px;\n            margin-bottom: 20px;\n        }}\n    </style>\n</head>\n<body>\n    <div class=\"container\">\n        <h1>📊 Table {table_ix + 1}</h1>\n        <div class=\"stats\">\n            <strong>Document:</strong> {doc_filename}<br>\n            <strong>Page:</strong> {table_data['page_num']} | \n            <strong>Generated:</strong> {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n        </div>\n        {table_data['html']}\n    </div>\n</body>\n</html>"""
+    with profile_stage(profiler, "write_html"), open(element_html_path, "w", encoding="utf-8") as fp:
+        fp.write(styled_html)
+    # Make the files durable before the table is checkpointed as done.
+    with profile_stage(profiler, "fsync"):
+        fsync_path(element_html_path)
+    _log.info(f"[Unstructured] Saved HTML: {element_html_path}")
+    # Convert to DataFrame and handle MultiIndex columns
+    try:
+        with profile_stage(profiler, "read_html"):
+            df_list = pd.read_html(StringIO(table_data['html']))
+        if df_list:
+            table_df = df_list[0]
+            if isinstance(table_df.columns, pd.MultiIndex):
+                table_df.columns = [' '.join(map(str, col)).strip() for col in table_df.columns.values]
+            excel_filename = f"{doc_filename}-table-{table_ix + 1}.xlsx"
+            element_excel_path = unstructured_dir / excel_filename
+            with profile_stage(profiler, "to_excel"):
+                table_df.to_excel(element_excel_path, index=False)
+            with profile_stage(profiler, "fsync"):
+                fsync_path(element_excel_path)
+            _log.info(f"[Unstructured] Saved Excel: {element_excel_path}")
+            return str(element_excel_path)
+    except Exception as e:
+        _log.warning(f"[Unstructured] Failed to convert HTML to Excel for table {table_ix + 1}: {str(e)}")
+    return None
@@ -0,0 +1,233 @@
+"""
+Streaming multipart upload ingestion into the uploads directory.
+"""
+import hashlib
+import re
+import shutil
+import time
+import uuid
+from pathlib import Path
+from typing import AsyncIterator, Dict, Iterable, Optional
+
+import python_multipart
+from python_multipart.multipart import parse_options_header
+from starlette.concurrency import run_in_threadpool
+
+_MAX_FIELD_BYTES = 64 * 1024
+_SAFE_NAME_RE = re.compile(r"[^A-Za-z0-9._ ()-]")
+
+
+class UploadError(Exception):
+    """Exception for rejected or malformed uploads."""
+    def __init__(self, message: str, status_code: int = 400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class StoredUpload:
+    """A file streamed into its own folder under the uploads directory."""
+    def __init__(self, upload_id: str, path: Path, file_name: str, size: int, sha256: str):
+        self.upload_id = upload_id
+        self.path = path
+        self.file_name = file_name
+        self.size = size
+        self.sha256 = sha256
+
+    def dict(self) -> dict:
+        return {
+            "upload_id": self.upload_id,
+            "file_name": self.file_name,
+            "path": str(self.path.absolute()),
+            "size": self.size,
+            "sha256": self.sha256,
+        }
+
+
+def safe_file_name(file_name: str) -> str:
+    """
+    Reduce a client supplied filename to a safe basename.
+    """
+    name = Path(file_name.replace("\\", "/")).name
+    name = _SAFE_NAME_RE.sub("_", name).strip(" .")
+    return name or "upload"
+
+
+class StreamingUploadParser:
+    """
+    Parse a multipart body, writing the file part straight into
+    ``upload_dir/<upload_id>/<filename>`` in fixed-size chunks.
+    Only one buffered chunk is held in memory at a time.
+    """
+    def __init__(
+        self,
+        content_type: str,
+        upload_dir: Path,
+        file_field: str = "file",
+        chunk_size: int = 1024 * 1024,
+        max_bytes: int = 200 * 1024 * 1024
+    ):
+        _, params = parse_options_header(content_type)
+        boundary = params.get(b"boundary")
+        if not boundary:
+            raise UploadError("Request must be multipart/form-data with a boundary.")
+        charset = params.get(b"charset", b"utf-8")
+        self._charset = charset.decode("latin-1") if isinstance(charset, bytes) else charset
+        self._parser = python_multipart.MultipartParser(boundary, {
+            "on_part_begin": self._on_part_begin,
+            "on_part_data": self._on_part_data,
+            "on_part_end": self._on_part_end,
+            "on_header_field": self._on_header_field,
+            "on_header_value": self._on_header_value,
+            "on_header_end": self._on_header_end,
+            "on_headers_finished": self._on_headers_finished,
+        })
+        self.upload_dir = upload_dir
+        self.file_field = file_field
+        self.chunk_size = chunk_size
+        self.max_bytes = max_bytes
+        self.fields: Dict[str, str] = {}
+        self._header_name = b""
+        self._header_value = b""
+        self._disposition = b""
+        self._field_name: Optional[str] = None
+        self._field_data = bytearray()
+        self._in_file = False
+        self._file_name: Optional[str] = None
+        self._buffer = bytearray()
+        self._finished_file = False
+        self._size = 0
+        self._hash = hashlib.sha256()
+        self._fp = None
+        self._part_path: Optional[Path] = None
+        self._upload_id = uuid.uuid4().hex
+
+    def _on_part_begin(self) -> None:
+        self._disposition = b""
+        self._field_name = None
+        self._field_data = bytearray()
+        self._in_file = False
+
+    def _on_header_field(self, data: bytes, start: int, end: int) -> None:
+        self._header_name += data[start:end]
+
+    def _on_header_value(self, data: bytes, start: int, end: int) -> None:
+        self._header_value += data[start:end]
+
+    def _on_header_end(self) -> None:
+        if self._header_name.lower() == b"content-disposition":
+            self._disposition = self._header_value
+        self._header_name = b""
+        self._header_value = b""
+
+    def _on_headers_finished(self) -> None:
+        _, options = parse_options_header(self._disposition)
+        if b"name" not in options:
+            raise UploadError('The Content-Disposition header field "name" must be provided.')
+        self._field_name = options[b"name"].decode(self._charset, errors="replace")
+        if b"filename" in options and self._field_name == self.file_field:
+            if self._file_name is not None:
+                raise UploadError(f"Only one '{self.file_field}' part is allowed.")
+            self._file_name = safe_file_name(options[b"filename"].decode(self._charset, errors="replace"))
+            self._in_file = True
+
+    def _on_part_data(self, data: bytes, start: int, end: int) -> None:
+        if self._in_file:
+            self._size += end - start
+            if self._size > self.max_bytes:
+                raise UploadError(f"Upload exceeds maximum size of {self.max_bytes} bytes.", status_code=413)
+            self._buffer += data[start:end]
+        else:
+            if len(self._field_data) + (end - start) > _MAX_FIELD_BYTES:
+                raise UploadError(f"Form field '{self._field_name}' is too large.", status_code=413)
+            self._field_data += data[start:end]
+
+    def _on_part_end(self) -> None:
+        if self._in_file:
+            self._finished_file = True
+        elif self._field_name is not None:
+            self.fields[self._field_name] = self._field_data.decode(self._charset, errors="replace")
+
+    def _open_part_file(self) -> None:
+        target_dir = self.upload_dir / self._upload_id
+        target_dir.mkdir(parents=True, exist_ok=True)
+        self._part_path = target_dir / f"{self._file_name}.part"
+        self._fp = open(self._part_path, "wb")
+
+    def _write_chunks(self, flush: bool) -> None:
+        """Write whole chunks from the buffer (and the remainder if ``flush``)."""
+        if self._fp is None:
+            self._open_part_file()
+        end = len(self._buffer)
+        if not flush:
+            end -= end % self.chunk_size
+        with memoryview(self._buffer) as view:
+            for offset in range(0, end, self.chunk_size):
+                with view[offset:min(offset + self.chunk_size, end)] as chunk:
+                    self._hash.update(chunk)
+                    self._fp.write(chunk)
+        del self._buffer[:end]
+
+    def _discard(self) -> None:
+        if self._fp is not None:
+            self._fp.close()
+            self._fp = None
+        shutil.rmtree(self.upload_dir / self._upload_id, ignore_errors=True)
+
+    async def parse(self, stream: AsyncIterator[bytes]) -> StoredUpload:
+        """
+        Consume the request body and return the stored upload.
+        Raises:
+            UploadError: If the body is malformed, too large or has no file part.
+        """
+        try:
+            async for data in stream:
+                self._parser.write(data)
+                if self._in_file and len(self._buffer) >= self.chunk_size:
+                    await run_in_threadpool(self._write_chunks, False)
+                if self._finished_file and self._buffer:
+                    await run_in_threadpool(self._write_chunks, True)
+            self._parser.finalize()
+            if self._file_name is None or not self._finished_file:
+                raise UploadError(f"Multipart body must contain a '{self.file_field}' file part.")
+            await run_in_threadpool(self._write_chunks, True)
+            self._fp.close()
+            self._fp = None
+            final_path = self._part_path.with_name(self._file_name)
+            self._part_path.rename(final_path)
+        except UploadError:
+            self._discard()
+            raise
+        except python_multipart.exceptions.MultipartParseError as e:
+            self._discard()
+            raise UploadError(f"Malformed multipart body: {e}")
+        except BaseException:
+            self._discard()
+            raise
+        return StoredUpload(self._upload_id, final_path, self._file_name, self._size, self._hash.hexdigest())
+
+
+def cleanup_expired_uploads(upload_dir: Path, ttl_seconds: int, in_use: Iterable[Path] = ()) -> int:
+    """
+    Remove upload folders older than ``ttl_seconds``.
+    Only folders created by ``StreamingUploadParser`` are touched, and folders
+    holding any of the ``in_use`` files (inputs of running or interrupted jobs) are kept.
+    Returns:
+        int: Number of removed uploads.
+    """
+    if not upload_dir.is_dir():
+        return 0
+    cutoff = time.time() - ttl_seconds
+    keep = {path.resolve().parent for path in in_use}
+    removed = 0
+    for entry in upload_dir.iterdir():
+        if not entry.is_dir() or not re.fullmatch(r"[0-9a-f]{32}", entry.name):
+            continue
+        if entry.resolve() in keep:
+            continue
+        try:
+            if entry.stat().st_mtime < cutoff:
+                shutil.rmtree(entry)
+                removed += 1
+        except FileNotFoundError:
+            continue
+    return removed
@@ -0,0 +1,130 @@
+"""
+Benchmark the per-table export stage on a synthetic many-table document.
+
+Runs the Docling and Unstructured export paths over N generated tables with
+the export pool disabled (serial), as a thread pool and as a process pool,
+and checks that every mode writes byte-identical CSV/Excel files in the same order.
+
+Usage:
+    python benchmarks/bench_table_export.py --tables 250 --rows 40 --workers 4
+"""
+import argparse
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+for key in ("llamaparse_api_key", "unstructured_api_key", "openai_api_key"):
+    os.environ.setdefault(key, "benchmark")
+
+import pandas as pd  # noqa: E402
+from app.core.config import settings  # noqa: E402
+from app.utils import table_export  # noqa: E402
+from app.utils.table_export import (  # noqa: E402
+    TableExporter, docling_table_html, export_docling_table, export_unstructured_table,
+    shutdown_export_executor, write_docling_table
+)
+
+_log = logging.getLogger("bench")
+
+
+class FakeDoclingTable:
+    """Stands in for a Docling TableItem: exports a DataFrame and an HTML table."""
+    def __init__(self, df: pd.DataFrame):
+        self._df = df
+
+    def export_to_dataframe(self) -> pd.DataFrame:
+        return self._df.copy()
+
+    def export_to_html(self, doc=None) -> str:
+        return self._df.to_html(index=False)
+
+
+def make_tables(n_tables: int, n_rows: int):
+    tables = []
+    for i in range(n_tables):
+        df = pd.DataFrame({
+            "Line item": [f"Item {i}-{r}" for r in range(n_rows)],
+            "2023": [f"{(i * 31 + r * 17) % 100000:,}" for r in range(n_rows)],
+            "2024": [f"{(i * 43 + r * 29) % 100000:,}" for r in range(n_rows)],
+            "Change %": [f"{((i + r) % 200 - 100) / 10:.1f}%" for r in range(n_rows)],
+        })
+        tables.append(df)
+    return tables
+
+
+def run_docling(tables, out_dir: Path) -> list:
+    docling_dir = out_dir / "docling"
+    docling_dir.mkdir(parents=True, exist_ok=True)
+    with TableExporter() as exporter:
+        for table_ix, df in enumerate(tables):
+            table = FakeDoclingTable(df)
+            if not exporter.uses_processes:
+                exporter.submit(export_docling_table, table, None, table_ix, "bench", docling_dir, _log)
+                continue
+            table_df = table.export_to_dataframe()
+            html_content, html_error = docling_table_html(table, None)
+            exporter.submit(write_docling_table, table_df, html_content, html_error, table_ix, "bench", docling_dir, _log)
+        return [info["filename_csv"] for info in exporter.results() if info is not None]
+
+
+def run_unstructured(tables, out_dir: Path) -> list:
+    unstructured_dir = out_dir / "unstructured"
+    unstructured_dir.mkdir(parents=True, exist_ok=True)
+    with TableExporter() as exporter:
+        for table_ix, df in enumerate(tables):
+            table_data = {"html": df.to_html(index=False), "text": "", "page_num": table_ix // 3 + 1}
+            exporter.submit(export_unstructured_table, table_data, table_ix, "bench", unstructured_dir, _log)
+        return [Path(p).name for p in exporter.results() if p is not None]
+
+
+def snapshot(out_dir: Path) -> dict:
+    # HTML embeds a generation timestamp, so compare the data files only.
+    return {
+        p.relative_to(out_dir).as_posix(): p.read_bytes() if p.suffix == ".csv" else pd.read_excel(p).to_csv()
+        for p in sorted(out_dir.rglob("*")) if p.suffix in (".csv", ".xlsx")
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tables", type=int, default=250)
+    parser.add_argument("--rows", type=int, default=40)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    tables = make_tables(args.tables, args.rows)
+    modes = [("serial", 0, "thread"), ("thread", args.workers, "thread"), ("process", args.workers, "process")]
+    print(f"{args.tables} tables x {args.rows} rows, {args.workers} workers")
+    baseline = None
+    for name, workers, executor in modes:
+        settings.export_workers = workers
+        settings.export_executor = executor
+        shutdown_export_executor()
+        table_export.get_export_executor()  # start the pool outside the timed region
+        out_dir = Path(tempfile.mkdtemp(prefix=f"bench-{name}-"))
+        try:
+            start = time.perf_counter()
+            docling_order = run_docling(tables, out_dir)
+            docling_time = time.perf_counter() - start
+            start = time.perf_counter()
+            unstructured_order = run_unstructured(tables, out_dir)
+            unstructured_time = time.perf_counter() - start
+            outputs = (docling_order, unstructured_order, snapshot(out_dir))
+            if baseline is None:
+                baseline = outputs
+            identical = outputs == baseline
+            print(f"{name:>8}: docling {docling_time:7.2f}s  unstructured {unstructured_time:7.2f}s  "
+                  f"identical output: {identical}")
+        finally:
+            shutil.rmtree(out_dir, ignore_errors=True)
+    shutdown_export_executor()
+
+
+if __name__ == "__main__":
+    main()
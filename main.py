@@ -5,11 +5,21 @@ Sets up the application, logging, routers, CORS, and error handling.
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
-from app.routers.extract import router as extract_router
+from app.routers.extract import router as extract_router, resume_pending_jobs
 from app.routers.health import router as health_router
+from app.routers.jobs import router as jobs_router
 from app.core.logging_config import configure_logging
 from app.core.exceptions import ServiceError
+from app.core.config import settings
+from app.utils.upload_utils import cleanup_expired_uploads
+from app.utils.table_export import shutdown_export_executor
+from app.core.job_registry import JobRejected, stop_accepting_jobs, wait_for_active_jobs, drain_time_left, job_input_paths
+from starlette.concurrency import run_in_threadpool
+from pathlib import Path
 import logging
+import math
+import signal
+import threading
 
 # Configure logging
 configure_logging()
@@ -34,6 +44,7 @@ app.add_middleware(
 # Include routers
 app.include_router(extract_router)
 app.include_router(health_router)
+app.include_router(jobs_router)
 
 # Error handler for custom service errors
 @app.exception_handler(ServiceError)
@@ -44,13 +55,61 @@ async def service_error_handler(request: Request, exc: ServiceError):
         content={"detail": str(exc)}
     )
 
+def install_drain_signal_handlers() -> None:
+    """
+    Start draining as soon as SIGINT/SIGTERM arrives. Uvicorn waits for in-flight
+    requests before running the shutdown event, so the drain has to begin here for
+    the deadline to cover /extract jobs too. Uvicorn's own handlers still run after ours.
+    """
+    if threading.current_thread() is not threading.main_thread():
+        return
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        previous = signal.getsignal(sig)
+        if not callable(previous):
+            continue
+        def handler(signum, frame, previous=previous):
+            stop_accepting_jobs(settings.shutdown_drain_seconds)
+            previous(signum, frame)
+        signal.signal(sig, handler)
+
+# Error handler for jobs that cannot be started or resumed
+@app.exception_handler(JobRejected)
+async def job_rejected_handler(request: Request, exc: JobRejected):
+    _log.error(f"JobRejected: {exc}")
+    return JSONResponse(
+        status_code=exc.status_code,
+        content={"detail": str(exc)}
+    )
+
 # Startup event handler
 @app.on_event("startup")
 async def on_startup():
     _log.info("Document Table Extractor API is starting up.")
+    install_drain_signal_handlers()
+    # Uploads still needed by interrupted jobs are kept, so they can be resumed below.
+    removed = cleanup_expired_uploads(Path(settings.upload_dir), settings.upload_ttl_seconds, job_input_paths())
+    if removed:
+        _log.info(f"Removed {removed} expired uploads from {settings.upload_dir}")
+    if settings.resume_jobs_on_startup:
+        resumed = resume_pending_jobs()
+        if resumed:
+            _log.info(f"Resuming {len(resumed)} interrupted jobs: {', '.join(resumed)}")
 
 # Shutdown event handler
 @app.on_event("shutdown")
 async def on_shutdown():
     _log.info("Document Table Extractor API is shutting down.")
+    # Normally draining started when the signal arrived; give in-flight jobs what is
+    # left of the deadline. Jobs still running afterwards keep their checkpoint and resume on next start.
+    stop_accepting_jobs(settings.shutdown_drain_seconds)
+    remaining = await run_in_threadpool(wait_for_active_jobs, drain_time_left())
+    if remaining:
+        _log.warning(f"Drain deadline reached with {len(remaining)} jobs in flight, they will resume on restart: {', '.join(remaining)}")
+    else:
+        _log.info("All in-flight jobs drained.")
+    shutdown_export_executor(wait_for_tasks=not remaining)
 
+if __name__ == "__main__":
+    import uvicorn
+    # Bound uvicorn's wait for in-flight requests by the same drain deadline.
+    uvicorn.run(app, host="0.0.0.0", port=8000, timeout_graceful_shutdown=math.ceil(settings.shutdown_drain_seconds))